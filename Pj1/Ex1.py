@@ -4,6 +4,11 @@ import logging
 import os
 import re
 from datetime import datetime
+try:
+    import pyarrow as pa  # Arrow CSV 读取、分组聚合以及 Parquet/Feather 输出依赖 pyarrow
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
 # 配置日志记录
 logging.basicConfig(
     level=logging.INFO,
@@ -14,12 +19,33 @@ logging.basicConfig(
     ]
 )
 logger = logging.getLogger()
-def clean_and_process_sales_data(input_file="sales_data.csv"):
+# 可自动修复的错误日期格式：YYYY/MM/DD 和 MM-DD-YYYY
+SLASH_DATE_PATTERN = re.compile(r'^\d{4}/\d{2}/\d{2}$')
+MDY_DATE_PATTERN = re.compile(r'^(\d{2})-(\d{2})-(\d{4})$')
+def sum_by_key(keys, values):
+    """按键分组求和，等价于 groupby(keys)[values].sum()
+    有 pyarrow 时使用 Arrow 的多线程哈希聚合，否则用 factorize + 一次 bincount 归约"""
+    if HAS_PYARROW:
+        key_array = pa.array(keys)
+        # category 列转成 Arrow 字典类型，需解码为普通值才能排序
+        if pa.types.is_dictionary(key_array.type):
+            key_array = key_array.dictionary_decode()
+        # 丢弃缺失的键（如 NaT），与 groupby 一致；按键排序输出
+        table = pa.table({'key': key_array, 'value': values}).drop_null()
+        result = table.group_by('key').aggregate([('value', 'sum')]).sort_by('key')
+        return result.column('key').to_pandas(), result.column('value_sum').to_numpy()
+    codes, uniques = pd.factorize(keys, sort=True)
+    # 缺失的键（如 NaT）编码为 -1，与 groupby 一样不参与分组
+    valid = codes >= 0
+    totals = np.bincount(codes[valid], weights=values[valid], minlength=len(uniques))
+    return uniques, totals
+def clean_and_process_sales_data(input_file="sales_data.csv", output_format="parquet"):
 #处理销售数据的完整流程：
 #1. 读取CSV文件
 #2. 清洗数据（处理缺失值、异常值、格式错误）
 #3. 生成统计报告
 #4. 保存清洗后的数据和统计报告
+#output_format: 清洗后数据的保存格式，可选 parquet（默认）、feather、csv
 
     try:
         #1.read data
@@ -29,8 +55,9 @@ def clean_and_process_sales_data(input_file="sales_data.csv"):
         if not os.path.exists(input_file):
             logger.error("Sales data file not found...")
             raise FileNotFoundError(f"文件不存在：{input_file}<UNK>")
-        #read file
-        df = pd.read_csv(input_file)
+        #read file：有 pyarrow 时使用多线程的 Arrow CSV 解析器
+        #date/sales/price 可能含格式错误的值，保持原样读入，留到清洗阶段统一处理
+        df = pd.read_csv(input_file, engine='pyarrow' if HAS_PYARROW else 'c')
         logger.info(f"成功读取数据，共{len(df)}行记录")
         #检查数据行数
         if len(df)<100:
@@ -42,71 +69,93 @@ def clean_and_process_sales_data(input_file="sales_data.csv"):
         missing_cols = [col for col in required_columns if col not in df.columns]
         if missing_cols:
             raise ValueError(f"CSV文件缺少必要的列: {', '.join(missing_cols)}")
-        # 转换日期格式
-        date_errors = []
-        for i, date_str in enumerate(df['date']):
-            try:
-                # 尝试解析日期
-                pd.to_datetime(date_str, format='%Y-%m-%d')
-            except:
-                date_errors.append(i)
-                # 尝试修复常见日期格式问题
-                if re.match(r'\d{4}/\d{2}/\d{2}', date_str):
-                    df.at[i, 'date'] = date_str.replace('/', '-')
-                elif re.match(r'\d{2}-\d{2}-\d{4}', date_str):
-                    parts = date_str.split('-')
-                df.at[i, 'date'] = f"{parts[2]}-{parts[0]}-{parts[1]}"
-        if date_errors:
-            logger.warning(f"发现并修复了 {len(date_errors)} 条日期格式问题")
+        df['product'] = df['product'].astype('category')
+        # 转换日期格式（整列一次解析，只对解析失败的行做修复）
+        parsed_dates = pd.to_datetime(df['date'], format='%Y-%m-%d', errors='coerce', cache=True)
+        bad_dates = parsed_dates.isna()
+        if bad_dates.any():
+            raw_dates = df.loc[bad_dates, 'date'].astype(str)
+            fixed_dates = raw_dates.copy()
+            # 尝试修复常见日期格式问题：YYYY/MM/DD -> YYYY-MM-DD
+            slash = raw_dates.str.match(SLASH_DATE_PATTERN, na=False)
+            fixed_dates[slash] = raw_dates[slash].str.replace('/', '-', regex=False)
+            # MM-DD-YYYY -> YYYY-MM-DD，一次 extract 取出三个字段
+            parts = raw_dates.str.extract(MDY_DATE_PATTERN)
+            mdy = parts[0].notna()
+            fixed_dates[mdy] = parts.loc[mdy, 2] + '-' + parts.loc[mdy, 0] + '-' + parts.loc[mdy, 1]
+            df.loc[bad_dates, 'date'] = fixed_dates
+            repaired_count = int(slash.sum() + mdy.sum())
+            if repaired_count:
+                logger.warning(f"发现并修复了 {repaired_count} 条日期格式问题")
 
         #确保日期是datetime类型
-        df['date'] = pd.to_datetime(df['date'], errors='coerce')
+        dates = pd.to_datetime(df['date'], format='%Y-%m-%d', errors='coerce', cache=True)
+        unparsed = dates.isna() & df['date'].notna()
+        if unparsed.any():
+            # 其他格式（如带时间的日期）交给 pandas 自动识别
+            dates[unparsed] = pd.to_datetime(df.loc[unparsed, 'date'], errors='coerce', cache=True)
+            invalid_count = int(dates[unparsed].isna().sum())
+            if invalid_count:
+                logger.warning(f"有 {invalid_count} 条日期无法解析，已记为缺失")
+        df['date'] = dates
 
-        #处理缺失值，销量军用均值填充
-        if df['sales'].isna().any():
-            # 计算均值时排除负值
-            valid_sales = df[df['sales'] >= 0]['sales']
-            mean_quantity = int(valid_sales.mean()) if not valid_sales.empty else 0
-        df['sales'] = df['sales'].fillna(mean_quantity)
-        logger.info(f"填充了 {df['sales'].isna().sum()} 个缺失的销量值，使用均值: {mean_quantity}")
+        # 处理非数值型数据：先统一转换为数值，转换失败的按缺失值处理
+        sales = pd.to_numeric(df['sales'], errors='coerce').to_numpy(dtype=np.float64, copy=True)
+        price = pd.to_numeric(df['price'], errors='coerce').to_numpy(dtype=np.float64, copy=True)
+        #处理缺失值，销量用均值填充
+        sales_missing = np.isnan(sales)
+        mean_quantity = 0
+        if sales_missing.any():
+            # 计算均值时排除负值（NaN 不满足比较条件，自动排除）
+            valid_sales = sales[sales >= 0]
+            mean_quantity = int(valid_sales.mean()) if valid_sales.size else 0
+            np.copyto(sales, mean_quantity, where=sales_missing)
+            logger.info(f"填充了 {sales_missing.sum()} 个缺失的销量值，使用均值: {mean_quantity}")
         # 价格用中位数填充
-        if df['price'].isna().any():
+        price_missing = np.isnan(price)
+        if price_missing.any():
             # 计算中位数时排除异常值
-            valid_prices = df[df['price'] <= 1000]['price']
-            median_price = valid_prices.median() if not valid_prices.empty else 0
-            df['price'] = df['price'].fillna(median_price)
-            logger.info(f"填充了 {df['price'].isna().sum()} 个缺失的价格值，使用中位数: {median_price:.2f}")
-        # 移除异常值
+            valid_prices = price[price <= 1000]
+            median_price = float(np.median(valid_prices)) if valid_prices.size else 0
+            np.copyto(price, median_price, where=price_missing)
+            logger.info(f"填充了 {price_missing.sum()} 个缺失或非数值型的价格值，使用中位数: {median_price:.2f}")
+        # 移除异常值：一次性构造布尔掩码，只切片一次
         initial_count = len(df)
-        # 销量 < 0 或 价格 > 1000
-        df = df[(df['sales'] >= 0) & (df['price'] <= 1000) & (df['price'] >0)]
+        # 销量 < 0 或 价格 > 1000 或 价格 <= 0
+        mask = (sales >= 0) & (price > 0) & (price <= 1000) & ~np.isnan(price)
+        # 压缩数值列后整列写回：销量转为最小的整数类型，价格转为 float32（product 读入时已是 category）
+        # 所有列写入都在切片之前完成，切片后不再修改，因此无需额外 copy 一份 DataFrame
+        df['sales'] = pd.to_numeric(sales, downcast='integer')
+        df['price'] = pd.to_numeric(price, downcast='float')
+        df = df.loc[mask]
         removed_count = initial_count - len(df)
         logger.info(f"移除了 {removed_count} 条异常记录（销量<0或价格>1000或价格<=0）")
-        # 处理非数值型价格数据
-        if df['price'].dtype != float and df['price'].dtype != int:
-            # 尝试转换价格为数值型
-            df['price'] = pd.to_numeric(df['price'], errors='coerce')
-            # 再次填充转换失败的价格
-            if df['price'].isna().any():
-                valid_prices = df[df['price'] <= 1000]['price']
-                median_price = valid_prices.median() if not valid_prices.empty else 0
-                df['price'] = df['price'].fillna(median_price)
-                logger.info(f"转换并填充了 {df['price'].isna().sum()} 个非数值型价格")
         #3.生成统计报告
         logger.info(f"计算统计指标...")
         #总销量
         total_sales=df['sales'].sum()
         #平均价格
         average_price=df['price'].mean()
+        sales = df['sales'].to_numpy(dtype=np.float64)
         #按产品分组的销量总和
-        grouped_sales=df.groupby('product')['sales'].sum().reset_index()
-        grouped_sales.columns=['产品','总销量']
+        products, product_totals = sum_by_key(df['product'], sales)
+        grouped_sales = pd.DataFrame({'产品': products, '总销量': product_totals.astype(np.int64)})
         #按日期分组的销量总和
-        daily_sales=df.groupby('date')['sales'].sum().reset_index()
-        daily_sales.columns=['日期','总销量']
+        dates, daily_totals = sum_by_key(df['date'], sales)
+        daily_sales = pd.DataFrame({'日期': dates, '总销量': daily_totals.astype(np.int64)})
         #4.保存清洗后的数据
-        cleaned_file= "cleaned_sales_data.csv"
-        df.to_csv(cleaned_file, index=False,encoding='utf-8-sig')
+        if output_format != "csv" and not HAS_PYARROW:
+            logger.warning(f"未安装pyarrow，无法保存为{output_format}格式，改为保存CSV")
+            output_format = "csv"
+        if output_format == "feather":
+            cleaned_file = "cleaned_sales_data.feather"
+            df.reset_index(drop=True).to_feather(cleaned_file)
+        elif output_format == "csv":
+            cleaned_file = "cleaned_sales_data.csv"
+            df.to_csv(cleaned_file, index=False, encoding='utf-8-sig')
+        else:
+            cleaned_file = "cleaned_sales_data.parquet"
+            df.to_parquet(cleaned_file, compression='snappy', index=False)
         logger.info(f"清洗后的数据已经保存到：{cleaned_file} (有{len(df)}行记录）")
         #5.保存统计报告
         report_file= "slaes_data_report.txt"
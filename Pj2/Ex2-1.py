@@ -2,6 +2,8 @@
 import re
 import argparse
 from collections import Counter
+# 标点符号匹配模式，模块加载时编译一次
+PUNCT_PATTERN = re.compile(r'[^\w\s]')
 def load_stopwords(file_path):
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
@@ -11,8 +13,7 @@ def load_stopwords(file_path):
         return set()
 def clean_text(text):
     # 去除标点符号，只保留字母和汉字
-    text = re.sub(r'[^\w\s]', '', text)
-    return text.lower()
+    return PUNCT_PATTERN.sub('', text).lower()
 def process_text_file(text_file, stopwords, topn):
     try:
         with open(text_file, 'r', encoding='utf-8') as f:
@@ -1,15 +1,14 @@
 import re
 import argparse
 from collections import Counter
-import matplotlib.pyplot as plt
-import matplotlib
+from itertools import takewhile
 import os
 import sys
 import jieba  # 添加中文分词库
 
-# 设置中文字体支持
-plt.rcParams['font.sans-serif'] = ['SimHei', 'Arial Unicode MS', 'WenQuanYi Micro Hei']
-plt.rcParams['axes.unicode_minus'] = False
+# 预编译正则：标点清洗、基础分词（两个及以上的字母/数字/汉字）
+PUNCT_PATTERN = re.compile(r'[^\w\s\u4e00-\u9fff]')
+TOKEN_PATTERN = re.compile(r'[\w\u4e00-\u9fff]{2,}')
 
 
 def read_file(file_path, encoding='utf-8'):
@@ -30,8 +29,7 @@ def read_file(file_path, encoding='utf-8'):
 def clean_text(text):
     """清洗文本：移除标点、转为小写"""
     # 移除非字母、非数字、非汉字的字符
-    text = re.sub(r'[^\w\s\u4e00-\u9fff]', '', text)
-    return text.lower()
+    return PUNCT_PATTERN.sub('', text).lower()
 
 
 def load_stopwords(stopwords_file):
@@ -58,17 +56,48 @@ def load_stopwords(stopwords_file):
         return default_stopwords
 
 
-def segment_text(text, use_jieba=True):
-    """中文分词处理"""
+def segment_text(text, stopwords=frozenset(), min_len=2, use_jieba=True):
+    """中文分词处理，返回逐个产出有效词的生成器（过滤停用词和短词，至少保留2个字的词）"""
+    min_len = max(min_len, 2)
     if use_jieba:
-        try:
-            # 使用jieba分词并过滤单字
-            return [word for word in jieba.cut(text) if len(word) >= 2]
-        except:
-            print("警告：jieba分词失败，使用基础分词")
-
-    # 基础分词作为后备
-    return re.findall(r'[\w\u4e00-\u9fff]{2,}', text)
+        words = jieba.cut(text)
+    else:
+        # 基础分词
+        words = TOKEN_PATTERN.findall(text)
+    return (word for word in words if len(word) >= min_len and word not in stopwords)
+
+
+def plot_top_words(top_words, top, plot_file='keywords_analysis.png'):
+    """绘制高频词柱状图；matplotlib 按需导入，并使用无界面的 Agg 后端"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    # 设置中文字体支持
+    plt.rcParams['font.sans-serif'] = ['SimHei', 'Arial Unicode MS', 'WenQuanYi Micro Hei']
+    plt.rcParams['axes.unicode_minus'] = False
+
+    words, counts = zip(*top_words)
+    plt.figure(figsize=(12, 7))
+    bars = plt.bar(words, counts, color='#4c72b0')
+
+    # 添加数值标签
+    for bar in bars:
+        height = bar.get_height()
+        plt.text(bar.get_x() + bar.get_width() / 2., height,
+                 f'{height}', ha='center', va='bottom', fontsize=9)
+
+    plt.title(f'文本高频词 TOP-{top}', fontsize=14)
+    plt.xlabel('关键词', fontsize=12)
+    plt.ylabel('出现频次', fontsize=12)
+    plt.xticks(rotation=45, ha='right', fontsize=10)
+    plt.grid(axis='y', linestyle='--', alpha=0.7)
+    plt.tight_layout()
+
+    # 保存图表
+    plt.savefig(plot_file, dpi=300, bbox_inches='tight')
+    plt.close()
+    print(f"高频词分析图已保存为: {plot_file}")
 
 
 def main():
@@ -80,6 +109,7 @@ def main():
     parser.add_argument('--top', type=int, default=15, help='显示前N个高频词')
     parser.add_argument('--min-len', type=int, default=2, help='单词最小长度')
     parser.add_argument('--min-freq', type=int, default=3, help='最小出现次数')
+    parser.add_argument('--no-plot', action='store_true', help='不绘制柱状图（跳过 matplotlib 导入）')
     args = parser.parse_args()
 
     try:
@@ -94,28 +124,16 @@ def main():
         stopwords = load_stopwords(args.stopwords)
         print(f"使用停用词: {len(stopwords)} 个")
 
-        # 4. 分词并过滤
-        words = segment_text(cleaned_text)
-        print(f"初始分词数量: {len(words)}")
-
-        # 过滤停用词和短词
-        filtered_words = [
-            word for word in words
-            if (word not in stopwords)
-               and (len(word) >= args.min_len)
-        ]
-
-        print(f"过滤后有效词汇: {len(filtered_words)}")
-
-        # 5. 统计词频
-        word_counts = Counter(filtered_words)
+        # 4. 分词并统计词频：有效词直接流入 Counter，不保存中间词列表
+        word_counts = Counter(segment_text(cleaned_text, stopwords, args.min_len))
+        print(f"过滤后有效词汇: {sum(word_counts.values())}")
 
-        # 过滤低频词
-        filtered_counts = {word: count for word, count in word_counts.items() if count >= args.min_freq}
-        print(f"满足最小频次({args.min_freq})的词汇: {len(filtered_counts)}")
+        # 5. 按频次降序只排序一次，截取满足最小频次的部分；前N高频词和完整输出共用这一结果
+        sorted_counts = list(takewhile(lambda item: item[1] >= args.min_freq, word_counts.most_common()))
+        print(f"满足最小频次({args.min_freq})的词汇: {len(sorted_counts)}")
 
         # 获取前N高频词
-        top_words = sorted(filtered_counts.items(), key=lambda x: x[1], reverse=True)[:args.top]
+        top_words = sorted_counts[:args.top]
 
         if not top_words:
             print("没有满足条件的高频词")
@@ -128,35 +146,16 @@ def main():
 
         # 7. 保存词频结果
         with open(args.output, 'w', encoding='utf-8') as f:
-            f.write(f"高频词统计结果 (共 {len(filtered_counts)} 个有效词)\n")
+            f.write(f"高频词统计结果 (共 {len(sorted_counts)} 个有效词)\n")
             f.write("===============================\n")
             f.write(f"词语\t出现次数\n")
-            for word, count in sorted(filtered_counts.items(), key=lambda x: x[1], reverse=True):
+            for word, count in sorted_counts:
                 f.write(f"{word}\t{count}\n")
         print(f"\n高频词结果已保存到: {args.output}")
 
         # 8. 绘制柱状图
-        words, counts = zip(*top_words)
-        plt.figure(figsize=(12, 7))
-        bars = plt.bar(words, counts, color='#4c72b0')
-
-        # 添加数值标签
-        for bar in bars:
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width() / 2., height,
-                     f'{height}', ha='center', va='bottom', fontsize=9)
-
-        plt.title(f'文本高频词 TOP-{args.top}', fontsize=14)
-        plt.xlabel('关键词', fontsize=12)
-        plt.ylabel('出现频次', fontsize=12)
-        plt.xticks(rotation=45, ha='right', fontsize=10)
-        plt.grid(axis='y', linestyle='--', alpha=0.7)
-        plt.tight_layout()
-
-        # 保存图表
-        plt.savefig('keywords_analysis.png', dpi=300, bbox_inches='tight')
-        print("高频词分析图已保存为: keywords_analysis.png")
-        plt.show()
+        if not args.no_plot:
+            plot_top_words(top_words, args.top)
 
     except Exception as e:
         print(f"程序执行出错: {str(e)}")
@@ -167,4 +166,7 @@ def main():
 if __name__ == "__main__":
     # 初始化jieba分词器
     jieba.initialize()
+    # POSIX系统下启用jieba多进程并行分词（Windows不支持）
+    if os.name == 'posix':
+        jieba.enable_parallel(os.cpu_count())
     main()
\ No newline at end of file
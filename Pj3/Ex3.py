@@ -1,59 +1,71 @@
 import json
-import math
 import logging
+import numpy as np
+from scipy import sparse
+try:
+    import orjson  # 可选：C 实现的 JSON 解析器，比标准库 json 快数倍
+except ImportError:
+    orjson = None
 # 配置日志
 logging.basicConfig(filename='recommend.log', level=logging.INFO, format='%(message)s')
 # 读取JSON文件
 def load_ratings(file_path):
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            # 验证评分合法性
-            for user, items in data.items():
-                for item, score in items.items():
-                    if not (0 <= score <= 5):
-                        raise ValueError(f"非法评分：用户 {user}, 物品 {item},评分 {score}")
-            return data
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        data = orjson.loads(raw) if orjson else json.loads(raw)
+        # 验证评分合法性
+        for user, items in data.items():
+            for item, score in items.items():
+                if not (0 <= score <= 5):
+                    raise ValueError(f"非法评分：用户 {user}, 物品 {item},评分 {score}")
+        return data
     except Exception as e:
         print(f"读取文件失败：{e}")
         return {}
-# 计算用户间余弦相似度
-def cosine_similarity(user_ratings1, user_ratings2):
-    common_items = set(user_ratings1.keys()) & set(user_ratings2.keys())
-    if not common_items:
-        return 0 # 没有共同评分
-    sum1 = sum(user_ratings1[item] * user_ratings2[item] for item in common_items)
-    sum1_sq = sum(user_ratings1[item] ** 2 for item in common_items)
-    sum2_sq = sum(user_ratings2[item] ** 2 for item in common_items)
-
-    denominator = math.sqrt(sum1_sq) * math.sqrt(sum2_sq)
-    return sum1 / denominator if denominator != 0 else 0
-# 推荐物品
-def recommend(user_id, ratings, top_n=3):
-    target_ratings = ratings.get(user_id)
-    if not target_ratings:
+# 构建 用户×物品 评分稀疏矩阵（CSR），行顺序与 ratings 中的用户顺序一致
+# 同时预先计算每个用户评分向量的 L2 范数，供余弦相似度复用
+def build_rating_matrix(ratings):
+    users = list(ratings)
+    item_index = {}
+    rows, cols, data = [], [], []
+    for i, user_ratings in enumerate(ratings.values()):
+        for item, score in user_ratings.items():
+            rows.append(i)
+            cols.append(item_index.setdefault(item, len(item_index)))
+            data.append(score)
+    matrix = sparse.csr_matrix((data, (rows, cols)), shape=(len(users), len(item_index)), dtype=np.float64)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    return users, list(item_index), matrix, norms
+# 推荐物品；rating_matrix 为 build_rating_matrix 的结果，多次推荐时可复用
+def recommend(user_id, ratings, top_n=3, rating_matrix=None):
+    if not ratings.get(user_id):
         print(f"用户 {user_id} 不存在。")
         return []
-    scores = {}
-    sim_sums = {}
-
-    for other_user, other_ratings in ratings.items():
-        if other_user == user_id:
-            continue
-        sim = cosine_similarity(target_ratings, other_ratings)
-        logging.info(f"相似度({user_id}, {other_user}) = {sim:.4f}")
-        for item, rating in other_ratings.items():
-            if item not in target_ratings:
-                scores.setdefault(item, 0)
-                sim_sums.setdefault(item, 0)
-                scores[item] += sim * rating
-                sim_sums[item] += sim
-    # 计算预测评分
-    predictions = []
-    for item in scores:
-        if sim_sums[item] != 0:
-            predicted_score = scores[item] / sim_sums[item]
-            predictions.append((item, round(predicted_score, 2)))
+    if rating_matrix is None:
+        rating_matrix = build_rating_matrix(ratings)
+    users, items, matrix, norms = rating_matrix
+    u = users.index(user_id)
+    # 目标用户与所有用户的余弦相似度：一次稀疏矩阵-向量乘法
+    dots = matrix @ matrix[u].toarray().ravel()
+    denominator = norms * norms[u]
+    sims = np.divide(dots, denominator, out=np.zeros_like(dots), where=denominator != 0)
+    sims[u] = 0  # 排除目标用户自身
+    # 相似度明细合并为一条日志写入
+    if logging.getLogger().isEnabledFor(logging.INFO):
+        logging.info("\n".join(
+            f"相似度({user_id}, {other_user}) = {sim:.4f}"
+            for other_user, sim in zip(users, sims) if other_user != user_id
+        ))
+    # 计算预测评分：加权评分和 / 相似度和（只累计评过该物品的用户）
+    rated = matrix.copy()
+    rated.data[:] = 1
+    scores = matrix.T @ sims
+    sim_sums = rated.T @ sims
+    # 只推荐目标用户未评分的物品
+    candidates = sim_sums != 0
+    candidates[matrix.indices[matrix.indptr[u]:matrix.indptr[u + 1]]] = False
+    predictions = [(items[j], round(float(scores[j] / sim_sums[j]), 2)) for j in np.flatnonzero(candidates)]
     predictions.sort(key=lambda x: x[1], reverse=True)
     return predictions[:top_n]
 # 写入推荐结果
@@ -69,8 +81,9 @@ def main():
     ratings = load_ratings('ratings.json')
     if not ratings:
         return
+    rating_matrix = build_rating_matrix(ratings)
     user_id = input("请输入目标用户ID（如 user1）: ").strip()
-    recommendations = recommend(user_id, ratings)
+    recommendations = recommend(user_id, ratings, rating_matrix=rating_matrix)
     if recommendations:
         print("推荐结果：")
         for item, score in recommendations:
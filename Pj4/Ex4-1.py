@@ -1,48 +1,61 @@
 import re
+import os
+import mmap
 from collections import Counter
 from datetime import datetime
 import logging
 # 设置日志记录
 logging.basicConfig(filename='log_parser_debug.log', level=logging.INFO,
 format='%(asctime)s - %(message)s')
-# 正则模式：提取 IP、时间、URL
-LOG_PATTERN = re.compile(r'(?P<ip>\d+\.\d+\.\d+\.\d+) - \[(?P<time>[\d\-:\s]+)\] "\w+ (?P<url>/[^\s]*)')
+# 正则模式：提取 IP、时间、URL（字节模式），末尾吃掉本行剩余内容，每行只取第一条
+LOG_PATTERN = re.compile(rb'(?P<ip>\d+\.\d+\.\d+\.\d+) - \[(?P<time>[\d\- :]+)\] "\w+ (?P<url>/[^\s]*)[^\n]*')
+# 统计行数的块大小
+LINE_COUNT_BLOCK = 1 << 20
+
+def count_lines(data):
+    # 统计行数（末行无换行符也计入）
+    lines = sum(data[i:i + LINE_COUNT_BLOCK].count(b'\n') for i in range(0, len(data), LINE_COUNT_BLOCK))
+    if len(data) and data[-1:] != b'\n':
+        lines += 1
+    return lines
 
 def parse_log(file_path, filter_date=None):
-    ip_counter = Counter()
-    url_counter = Counter()
+    ips = []
+    urls = []
     total_lines = 0
-    valid_lines = 0
-    with open(file_path, 'r') as f:
-        for line in f:
-            total_lines += 1
-            match = LOG_PATTERN.search(line)
-            if not match:
-                logging.warning(f"无效日志行: {line.strip()}")
-            continue
-            ip = match.group('ip')
-            time_str = match.group('time')
-            url = match.group('url')
-
-            # 时间过滤
-            if filter_date:
-                log_date = datetime.strptime(time_str, '%Y-%m-%d% H: % M: %S').date()
-                if str(log_date) != filter_date:
+    matched_lines = 0
+    date_prefix = filter_date.encode() if filter_date is not None else None
+    # mmap 无法映射空文件
+    if os.path.getsize(file_path) > 0:
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            total_lines = count_lines(mm)
+            for match in LOG_PATTERN.finditer(mm):
+                matched_lines += 1
+                # 时间过滤：日志时间以 YYYY-MM-DD 开头，直接比较日期前缀，无需解析时间
+                if date_prefix is not None and not match.group('time').startswith(date_prefix):
                     continue
-            ip_counter[ip] += 1
-            url_counter[url] += 1
-            valid_lines += 1
+                ips.append(match.group('ip'))
+                urls.append(match.group('url'))
+    # 匹配结束后一次性计数
+    ip_counter = Counter(ips)
+    url_counter = Counter(urls)
+    valid_lines = len(ips)
+    if total_lines > matched_lines:
+        logging.warning(f"无效日志行 {total_lines - matched_lines} 行")
     logging.info(f"处理完成，共 {total_lines} 行，有效日志行 {valid_lines} 行")
-    return ip_counter.most_common(10), url_counter.most_common(10)
+    # 计数器的键是字节串，只对输出的前10项解码
+    top_ips = [(ip.decode('ascii'), count) for ip, count in ip_counter.most_common(10)]
+    top_urls = [(url.decode('utf-8', errors='replace'), count) for url, count in url_counter.most_common(10)]
+    return top_ips, top_urls
 def save_stats(ip_stats, url_stats, output_file):
     with open(output_file, 'a', encoding='utf-8') as f:
         f.write('Top 10 IPs:\n')
-    for ip, count in ip_stats:
-        f.write(f'{ip}: {count}\n')
-    f.write('\nTop 10 URLs:\n')
-    for url, count in url_stats:
-        f.write(f'{url}: {count}\n')
-    f.write('\n')
+        for ip, count in ip_stats:
+            f.write(f'{ip}: {count}\n')
+        f.write('\nTop 10 URLs:\n')
+        for url, count in url_stats:
+            f.write(f'{url}: {count}\n')
+        f.write('\n')
 
 if __name__ == "__main__":
     log_file = 'server.log'
@@ -50,6 +63,12 @@ if __name__ == "__main__":
     date_filter = input("请输入要分析的日期 (格式 YYYY-MM-DD)，留空表示不过滤:").strip()
     if date_filter == '':
         date_filter = None
+    else:
+        # 输入的日期只解析一次并规范为 YYYY-MM-DD（如 2025-5-1 -> 2025-05-01），日志行只做前缀比较
+        try:
+            date_filter = datetime.strptime(date_filter, '%Y-%m-%d').strftime('%Y-%m-%d')
+        except ValueError:
+            raise SystemExit(f"日期格式错误: {date_filter}，应为 YYYY-MM-DD")
 
     ip_stats, url_stats = parse_log(log_file, date_filter)
     save_stats(ip_stats, url_stats, output_file)
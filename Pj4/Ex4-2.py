@@ -1,14 +1,18 @@
 import re
 import argparse
 import os
+import mmap
 from datetime import datetime
-from collections import defaultdict
 import sys
-import matplotlib.pyplot as plt
 import numpy as np
+import pandas as pd
 
-# 日志行匹配的正则表达式
-LOG_PATTERN = r'^(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}) - \[(.*?)\] "(GET|POST|PUT|DELETE|HEAD|OPTIONS) ([^ ?]+).*"'
+# 日志行匹配的正则表达式（按行匹配字节内容）
+LOG_PATTERN = re.compile(
+    rb'^[ \t]*(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}) - \[(.*?)\] "(?:GET|POST|PUT|DELETE|HEAD|OPTIONS) ([^ ?\r\n]+).*"',
+    re.M
+)
+LINE_COUNT_BLOCK = 1 << 20
 
 
 def parse_args():
@@ -39,75 +43,72 @@ def parse_datetime(time_str):
     raise ValueError(f"无效的时间格式: {time_str}")
 
 
-def filter_time(log_time, start_dt, end_dt):
-    """检查日志时间是否在指定范围内"""
-    if start_dt and log_time < start_dt:
-        return False
-    if end_dt and log_time > end_dt:
-        return False
-    return True
+def count_lines(data):
+    """统计文件总行数"""
+    lines = sum(data[i:i + LINE_COUNT_BLOCK].count(b'\n') for i in range(0, len(data), LINE_COUNT_BLOCK))
+    if len(data) and data[-1:] != b'\n':
+        lines += 1
+    return lines
 
 
-def analyze_log(file_path, start_dt=None, end_dt=None):
-    """分析日志文件并返回统计结果"""
-    ip_counter = defaultdict(int)
-    url_counter = defaultdict(int)
-    invalid_count = 0
-    total_lines = 0
+def decode_text(raw):
+    """解码日志中的字节串，优先UTF-8，失败时按GBK解码"""
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        return raw.decode('gbk', errors='replace')
+
+
+def collect_records(data):
+    """在整个日志内容上一次性匹配所有日志行，返回IP、时间、URL三个字节串列表以及无法匹配的行数和总行数"""
+    ips, times, urls = [], [], []
+    for match in LOG_PATTERN.finditer(data):
+        ip, time_str, url = match.groups()
+        ips.append(ip)
+        times.append(time_str)
+        urls.append(url)
+    total_lines = count_lines(data)
+    return ips, times, urls, total_lines - len(ips), total_lines
+
 
+def analyze_log(file_path, start_dt=None, end_dt=None):
+    """分析日志文件并返回统计结果（按访问次数降序排列的IP、URL计数）"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                total_lines += 1
-                match = re.match(LOG_PATTERN, line.strip())
-                if not match:
-                    invalid_count += 1
-                    continue
-
-                ip, time_str, _, url = match.groups()
-                try:
-                    log_dt = datetime.strptime(time_str, '%Y-%m-%d %H:%M:%S')
-                except ValueError:
-                    invalid_count += 1
-                    continue
-
-                if not filter_time(log_dt, start_dt, end_dt):
-                    continue
-
-                ip_counter[ip] += 1
-                url_counter[url] += 1
+        if os.path.getsize(file_path) == 0:
+            # mmap 无法映射空文件
+            records = [], [], [], 0, 0
+        else:
+            with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                records = collect_records(mm)
     except FileNotFoundError:
         print(f"错误: 文件 {file_path} 不存在")
         sys.exit(1)
-    except UnicodeDecodeError:
-        try:
-            # 尝试使用GBK编码再次打开
-            print("尝试使用GBK编码重新读取文件...")
-            with open(file_path, 'r', encoding='gbk') as f:
-                for line in f:
-                    total_lines += 1
-                    match = re.match(LOG_PATTERN, line.strip())
-                    if not match:
-                        invalid_count += 1
-                        continue
-
-                    ip, time_str, _, url = match.groups()
-                    try:
-                        log_dt = datetime.strptime(time_str, '%Y-%m-%d %H:%M:%S')
-                    except ValueError:
-                        invalid_count += 1
-                        continue
-
-                    if not filter_time(log_dt, start_dt, end_dt):
-                        continue
-
-                    ip_counter[ip] += 1
-                    url_counter[url] += 1
-        except:
-            print(f"错误: 文件 {file_path} 编码问题，无法读取")
-            sys.exit(1)
-
-    return ip_counter, url_counter, invalid_count, total_lines
+
+    ips, times, urls, invalid_count, total_lines = records
+    # 一次性向量化解析全部时间，重复的时间戳只解析一次
+    times = pd.Series(times, dtype=object).str.decode('ascii', errors='replace')
+    df = pd.DataFrame({
+        'ip': ips,
+        'time': pd.to_datetime(times, format='%Y-%m-%d %H:%M:%S', errors='coerce', cache=True),
+        'url': urls,
+    })
+
+    # 时间无法解析的行计为无效行，再按时间范围过滤
+    bad_time = df['time'].isna()
+    invalid_count += int(bad_time.sum())
+    mask = ~bad_time
+    if start_dt:
+        mask &= df['time'] >= start_dt
+    if end_dt:
+        mask &= df['time'] <= end_dt
+    df = df[mask]
+
+    # 计数的键是字节串，只对去重后的IP、URL解码
+    ip_counts = df['ip'].value_counts()
+    ip_counts.index = ip_counts.index.map(decode_text)
+    url_counts = df['url'].value_counts()
+    url_counts.index = url_counts.index.map(decode_text)
+    return ip_counts, url_counts, invalid_count, total_lines
 
 
 def save_results(ip_counter, url_counter, invalid_count, total_lines, args):
@@ -137,13 +138,13 @@ def save_results(ip_counter, url_counter, invalid_count, total_lines, args):
 
             # 处理IP统计
             f.write("=== 访问次数最多的IP ===\n")
-            top_ips = sorted(ip_counter.items(), key=lambda x: x[1], reverse=True)[:10]
+            top_ips = ip_counter.head(10).items()
             for i, (ip, count) in enumerate(top_ips, 1):
                 f.write(f"{i:2d}. IP: {ip:<15} 次数: {count}\n")
 
             # 处理URL统计
             f.write("\n=== 访问频率最高的URL ===\n")
-            top_urls = sorted(url_counter.items(), key=lambda x: x[1], reverse=True)[:10]
+            top_urls = url_counter.head(10).items()
             for i, (url, count) in enumerate(top_urls, 1):
                 # 截断过长的URL
                 display_url = url if len(url) <= 50 else url[:47] + "..."
@@ -158,9 +159,13 @@ def save_results(ip_counter, url_counter, invalid_count, total_lines, args):
 
 
 def generate_bar_chart(data, title, xlabel, ylabel, filename, is_url=False):
-    """生成柱状图并保存"""
-    # 提取前10项
-    items = sorted(data.items(), key=lambda x: x[1], reverse=True)[:10]
+    """生成柱状图并保存；matplotlib 只在需要绘图时导入，并使用无界面的 Agg 后端"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    # 提取前10项（计数已按降序排列）
+    items = list(data.head(10).items())
     labels = [item[0] for item in items]
     counts = [item[1] for item in items]
 
@@ -1,82 +1,143 @@
-import threading
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 import os
+import sys
 import time
 import logging
 import argparse
-import jieba
+try:
+    import jieba_fast as jieba  # C 加速版 jieba，接口相同
+except ImportError:
+    import jieba
+try:
+    import ahocorasick  # 可选：Aho-Corasick 自动机，按固定词表在C层一次扫描全文
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
 import re
 
 # 设置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# 纯中文且长度为2~3个字的词，模块加载时编译一次
+_CJK_WORD = re.compile(r'[\u4e00-\u9fff]{2,3}').fullmatch
+
 # 加载停用词
 def load_stopwords(filepath):
     try:
+        # 一次读入后按空白切分
         with open(filepath, 'r', encoding='utf-8') as f:
-            return set(word.strip() for word in f if word.strip())
+            return frozenset(sys.intern(word) for word in f.read().split())
     except Exception as e:
         logging.error(f"读取停用词失败: {e}")
-        return set()
-
-# 线程任务：分词、过滤、统计
-def count_words(text, stopwords, result_list, index):
+        return frozenset()
+
+# 子进程内共享的停用词和自动机
+_stopwords = frozenset()
+_automaton = None
+
+# 用jieba词典中2~3个字的纯中文词（去掉停用词）构建 Aho-Corasick 自动机
+def build_automaton(stopwords):
+    jieba.initialize()
+    automaton = ahocorasick.Automaton()
+    for word, freq in jieba.dt.FREQ.items():
+        # FREQ 中频次为0的是前缀占位项，不是真正的词
+        if freq and _CJK_WORD(word) and word not in stopwords:
+            automaton.add_word(word, word)
+    automaton.make_automaton()
+    return automaton
+
+# 进程池初始化：保存停用词和父进程构建好的自动机；不用自动机时预先加载jieba词典
+def _init_worker(stopwords, automaton=None):
+    global _stopwords, _automaton
+    _stopwords = stopwords
+    _automaton = automaton
+    _keep.cache_clear()
+    if automaton is None:
+        jieba.initialize()
+
+# 判断分词结果是否保留：纯中文、非停用词、长度为2~3个字，按词缓存结果
+@lru_cache(maxsize=1 << 17)
+def _keep(w):
+    return 2 <= len(w) <= 3 and w not in _stopwords and _CJK_WORD(w) is not None
+
+# 读取文件中 [start, end) 字节范围的内容
+def read_chunk(filepath, start, end):
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        return f.read(end - start).decode('utf-8')
+
+# 进程任务：读取自己负责的字节范围，分词、过滤、统计，返回该块的词频
+def count_words(index, chunk):
     start_time = time.time()
-    words = jieba.lcut(text)
-    # 保留：纯中文、非停用词、长度为2~3个字的词
-    filtered = [
-        w for w in words
-        if re.match(r'^[\u4e00-\u9fff]+$', w)
-        and w not in stopwords
-        and 2 <= len(w) <= 3
-    ]
-    word_count = Counter(filtered)
-    result_list[index] = word_count
+    text = read_chunk(*chunk)
+    if _automaton is not None:
+        # 词表已按长度、纯中文和停用词过滤，自动机命中的都是有效词（重叠的词各计一次）
+        word_count = Counter(word for _, word in _automaton.iter(text))
+    else:
+        # 关闭 HMM 新词发现
+        words = jieba.cut(text, HMM=False)
+        word_count = Counter(w for w in words if _keep(w))
     elapsed = time.time() - start_time
-    logging.info(f"线程-{index+1} 完成: 用时 {elapsed:.2f}s，词数: {len(filtered)}")
+    logging.info(f"进程-{index+1} 完成: 用时 {elapsed:.2f}s，词数: {sum(word_count.values())}")
+    return word_count
 
-# 分片读取文件
+# 按字节范围分片，分界点对齐到行首
 def read_file_chunks(filepath, num_chunks):
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-
         total_size = os.path.getsize(filepath)
-        chunk_size = len(lines) // num_chunks
-        chunks = [lines[i*chunk_size : (i+1)*chunk_size] for i in range(num_chunks - 1)]
-        chunks.append(lines[(num_chunks - 1)*chunk_size:])  # 最后一块
-
-        logging.info(f"文件大小: {total_size} 字节，{len(lines)} 行，分成 {num_chunks} 块")
-        return [''.join(chunk) for chunk in chunks]
+        stride = total_size // num_chunks
+        bounds = [0]
+        with open(filepath, 'rb') as f:
+            for i in range(1, num_chunks):
+                # 跳到大致位置后读完当前这一行，使分界点落在下一行行首
+                f.seek(max(i * stride, bounds[-1]))
+                f.readline()
+                bounds.append(min(f.tell(), total_size))
+        bounds.append(total_size)
+        # 小文件可能出现空范围，直接丢弃
+        chunks = [(filepath, start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+        logging.info(f"文件大小: {total_size} 字节，分成 {len(chunks)} 块")
+        return chunks
 
     except Exception as e:
         logging.error(f"读取文件失败: {e}")
         return []
 
 # 主逻辑
-def main(file_path='large_text.txt', stopwords_path='stopwords.txt', num_threads=4, output_path='word_counts.txt'):
+def main(file_path='large_text.txt', stopwords_path='stopwords.txt', num_threads=4, output_path='word_counts.txt',
+         engine='jieba'):
     stopwords = load_stopwords(stopwords_path)
     if not stopwords:
         logging.warning("停用词列表为空，将不会过滤任何词。")
+    if engine == 'ac' and not HAS_AHOCORASICK:
+        logging.warning("未安装 pyahocorasick，改用 jieba 分词")
+        engine = 'jieba'
+    # 自动机只在父进程构建一次，再交给各子进程
+    automaton = build_automaton(stopwords) if engine == 'ac' else None
 
     chunks = read_file_chunks(file_path, num_threads)
     if not chunks:
         return
 
-    threads = []
-    results = [None] * num_threads
-
-    for i in range(num_threads):
-        t = threading.Thread(target=count_words, args=(chunks[i], stopwords, results, i))
-        threads.append(t)
-        t.start()
-
-    for t in threads:
-        t.join()
+    # 多进程并行分词统计
+    # 进程数不超过块数和CPU核数
+    num_workers = min(num_threads, len(chunks), os.cpu_count() or 1)
+    try:
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker,
+                                 initargs=(stopwords, automaton)) as executor:
+            results = list(executor.map(count_words, range(len(chunks)), chunks))
+    except (OSError, UnicodeDecodeError) as e:
+        # 子进程读取或解码失败时异常会传回这里
+        logging.error(f"读取文件失败: {e}")
+        return
 
-    # 合并Counter
-    final_count = Counter()
-    for c in results:
+    # 合并Counter：以最大的块结果为基础
+    results.sort(key=len, reverse=True)
+    final_count = results[0]
+    for c in results[1:]:
         final_count.update(c)
 
     # 输出前10高频词
@@ -90,11 +151,14 @@ def main(file_path='large_text.txt', stopwords_path='stopwords.txt', num_threads
 
 # 命令行接口
 if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description="中文多线程词频统计器")
+    parser = argparse.ArgumentParser(description="中文多进程词频统计器")
     parser.add_argument('--file', type=str, default='large_text.txt', help='输入文本路径')
     parser.add_argument('--stopwords', type=str, default='stopwords.txt', help='停用词路径')
-    parser.add_argument('--threads', type=int, default=4, help='线程数量')
+    parser.add_argument('--threads', type=int, default=4, help='并行进程数量')
     parser.add_argument('--output', type=str, default='word_counts.txt', help='输出路径')
+    parser.add_argument('--engine', choices=['jieba', 'ac'], default='jieba',
+                        help='jieba: 分词后统计词频（默认）；ac: 用词典构建 Aho-Corasick 自动机扫描全文（需 pyahocorasick），'
+                             '统计的是重叠的子串命中次数而非分词词频，如"小王子"同时计入"王子"')
     args = parser.parse_args()
 
-    main(args.file, args.stopwords, args.threads, args.output)
+    main(args.file, args.stopwords, args.threads, args.output, args.engine)
@@ -1,12 +1,88 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import matplotlib as mpl
+# 绘图使用 Figure 和 Agg 画布
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import logging
 import argparse
 import sys
 import os
-import codecs
+try:
+    from numba import njit  # 可选依赖
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+# 分块读取的行数
+CHUNK_SIZE = 500_000
+# 折线图最多绘制的点数
+MAX_PLOT_POINTS = 20_000
+
+
+def _analyze_kernel(values, window, threshold):
+    """单个循环内完成：滑动窗口累加求尾随移动平均(min_periods=1)、残差、两遍法样本标准差、异常标记"""
+    n = values.shape[0]
+    # 结果为 float32，累加量用 float64
+    moving_avg = np.empty_like(values)
+    residual = np.empty_like(values)
+    window_sum = 0.0
+    compensation = 0.0
+    same_run = 0
+    resid_sum = 0.0
+    for i in range(n):
+        # 滑动窗口求和（Kahan 补偿）
+        y = float(values[i]) - compensation
+        t = window_sum + y
+        compensation = (t - window_sum) - y
+        window_sum = t
+        if i >= window:
+            y = -float(values[i - window]) - compensation
+            t = window_sum + y
+            compensation = (t - window_sum) - y
+            window_sum = t
+        count = min(i + 1, window)
+        # 窗口内值全相同时直接取该值，与 pandas 一致
+        same_run = same_run + 1 if i > 0 and values[i] == values[i - 1] else 1
+        moving_avg[i] = values[i] if same_run >= count else window_sum / count
+        residual[i] = values[i] - moving_avg[i]
+        resid_sum += float(residual[i])
+    # 第二遍计算样本标准差(ddof=1)，与 pandas 的 std() 一致
+    std_dev = np.nan
+    if n > 1:
+        resid_mean = resid_sum / n
+        sq_sum = 0.0
+        for i in range(n):
+            sq_sum += (float(residual[i]) - resid_mean) ** 2
+        std_dev = np.sqrt(sq_sum / (n - 1))
+    is_anomaly = np.abs(residual) > threshold * std_dev
+    return moving_avg, residual, is_anomaly, std_dev
+
+
+if HAS_NUMBA:
+    _analyze_kernel = njit(cache=True)(_analyze_kernel)
+
+
+def trailing_moving_average(values, window):
+    """用前缀和计算尾随移动平均（min_periods=1）"""
+    prefix = np.cumsum(values, dtype=np.float64)
+    window_sums = prefix.copy()
+    window_sums[window:] -= prefix[:-window]
+    counts = np.minimum(np.arange(1, len(values) + 1), window)
+    return window_sums / counts
+
+
+def analyze_series(values, window_size, threshold):
+    """计算移动平均、残差、残差标准差和异常标记（数值按 float32 计算）；没有 Numba 时使用 NumPy 实现"""
+    if window_size < 1:
+        raise ValueError(f"移动平均窗口必须为正整数: {window_size}")
+    values = np.ascontiguousarray(values, dtype=np.float32)
+    if HAS_NUMBA:
+        return _analyze_kernel(values, window_size, float(threshold))
+    moving_avg = trailing_moving_average(values, window_size).astype(np.float32)
+    residual = values - moving_avg
+    std_dev = residual.std(ddof=1) if residual.size > 1 else np.nan
+    return moving_avg, residual, np.abs(residual) > threshold * std_dev, std_dev
 
 
 # 配置中文字体支持
@@ -15,16 +91,16 @@ def configure_chinese_font():
     try:
         # Windows系统使用SimHei
         if sys.platform.startswith('win'):
-            plt.rcParams['font.sans-serif'] = ['SimHei']
+            mpl.rcParams['font.sans-serif'] = ['SimHei']
         # macOS系统使用Heiti SC
         elif sys.platform.startswith('darwin'):
-            plt.rcParams['font.sans-serif'] = ['Heiti SC']
+            mpl.rcParams['font.sans-serif'] = ['Heiti SC']
         # Linux系统使用WenQuanYi Micro Hei
         else:
-            plt.rcParams['font.sans-serif'] = ['WenQuanYi Micro Hei']
+            mpl.rcParams['font.sans-serif'] = ['WenQuanYi Micro Hei']
 
         # 解决负号显示问题
-        plt.rcParams['axes.unicode_minus'] = False
+        mpl.rcParams['axes.unicode_minus'] = False
         return True
     except:
         return False
@@ -64,24 +140,29 @@ def process_time_series(input_file, window_size=7, threshold=2):
         if not os.path.exists(input_file):
             raise FileNotFoundError(f"文件不存在: {input_file}")
 
-        # 检查文件编码
-        try:
-            with open(input_file, 'rb') as f:
-                result = f.read(4096)
-            encoding = 'utf-8' if result.startswith(codecs.BOM_UTF8) else None
-        except:
-            encoding = None
-
-        logger.info(f"尝试读取文件: {input_file} (编码: {encoding or '自动检测'})")
-
-        df = pd.read_csv(input_file, parse_dates=['date'], date_format='%Y-%m-%d', encoding=encoding)
-        logger.info(f"成功读取文件，共 {len(df)} 条记录")
+        # utf-8-sig 自动去掉 BOM
+        logger.info(f"尝试读取文件: {input_file} (编码: utf-8-sig)")
+
+        # 分块读取并清理空值
+        reader = pd.read_csv(input_file, parse_dates=['date'], date_format='%Y-%m-%d', encoding='utf-8-sig',
+                             chunksize=CHUNK_SIZE)
+        parts = []
+        total_rows = nan_count = 0
+        for chunk in reader:
+            total_rows += len(chunk)
+            chunk_nan = int(chunk.isnull().sum().sum())
+            if chunk_nan:
+                nan_count += chunk_nan
+                chunk = chunk.dropna()
+            parts.append(chunk)
+        df = pd.concat(parts, ignore_index=True)
+        # 数值列压缩为 float32
+        df['value'] = df['value'].astype(np.float32)
+        logger.info(f"成功读取文件，共 {total_rows} 条记录")
 
         # 验证数据完整性
-        if df.isnull().any().any():
-            nan_count = df.isnull().sum().sum()
+        if nan_count:
             logger.warning(f"发现 {nan_count} 个空值，将进行清理")
-            df = df.dropna()
             logger.info(f"清理后剩余 {len(df)} 条记录")
 
         # 验证日期格式
@@ -98,7 +179,9 @@ def process_time_series(input_file, window_size=7, threshold=2):
         df.sort_values('date', inplace=True)  # 确保按日期排序
         logger.info(f"按日期排序数据，开始日期: {df['date'].min().date()}，结束日期: {df['date'].max().date()}")
 
-        df['moving_avg'] = df['value'].rolling(window=window_size, min_periods=1).mean()
+        # 在 ndarray 上计算，结果一次 assign 回 DataFrame
+        moving_avg, residual, is_anomaly, std_dev = analyze_series(df['value'].to_numpy(), window_size, threshold)
+        df = df.assign(moving_avg=moving_avg, is_anomaly=is_anomaly)
         logger.info(f"计算完成 {window_size} 天移动平均")
     except Exception as e:
         logger.error(f"移动平均计算失败: {str(e)}", exc_info=True)
@@ -106,21 +189,20 @@ def process_time_series(input_file, window_size=7, threshold=2):
 
     # 3. 检测异常点
     try:
-        # 计算残差和标准差
-        df['residual'] = df['value'] - df['moving_avg']
-        std_dev = df['residual'].std()
+        # 残差标准差
         logger.info(f"残差标准差: {std_dev:.4f}")
 
-        # 标记异常点
-        df['is_anomaly'] = np.abs(df['residual']) > (threshold * std_dev)
-        anomaly_count = df['is_anomaly'].sum()
+        # 异常点数量直接在布尔数组上统计
+        anomaly_count = int(is_anomaly.sum())
         logger.info(f"检测到 {anomaly_count} 个异常点 (阈值 = {threshold}σ)")
 
-        # 如果有异常点，记录详细信息
-        if anomaly_count > 0:
-            anomalies = df[df['is_anomaly']]
-            for idx, row in anomalies.iterrows():
-                logger.info(f"异常点: {row['date'].date()} - 值: {row['value']:.4f} (残差: {row['residual']:.4f})")
+        # 有异常点时合并为一条日志记录详细信息
+        if anomaly_count > 0 and logger.isEnabledFor(logging.INFO):
+            # 直接遍历 ndarray
+            dates = df['date'][is_anomaly].dt.strftime('%Y-%m-%d').to_numpy()
+            lines = [f"异常点: {date} - 值: {value:.4f} (残差: {resid:.4f})"
+                     for date, value, resid in zip(dates, df['value'].to_numpy()[is_anomaly], residual[is_anomaly])]
+            logger.info("异常点明细:\n" + "\n".join(lines))
     except Exception as e:
         logger.error(f"异常检测失败: {str(e)}", exc_info=True)
         raise
@@ -130,32 +212,36 @@ def process_time_series(input_file, window_size=7, threshold=2):
         # 配置中文支持
         font_success = configure_chinese_font()
 
-        plt.figure(figsize=(12, 6))
+        fig = Figure(figsize=(12, 6))
+        FigureCanvasAgg(fig)
+        ax = fig.subplots()
 
-        # 绘制原始数据和移动平均线
-        plt.plot(df['date'], df['value'], label='原始数据', color='blue', alpha=0.7)
-        plt.plot(df['date'], df['moving_avg'], label=f'{window_size}天移动平均',
-                 color='green', linewidth=2)
+        # 绘制原始数据和移动平均线（点数过多时抽样）
+        stride = -(-len(df) // MAX_PLOT_POINTS)
+        plot_df = df.iloc[::stride] if stride > 1 else df
+        ax.plot(plot_df['date'], plot_df['value'], label='原始数据', color='blue', alpha=0.7)
+        ax.plot(plot_df['date'], plot_df['moving_avg'], label=f'{window_size}天移动平均',
+                color='green', linewidth=2)
 
         # 标记异常点
         anomalies = df[df['is_anomaly']]
-        plt.scatter(anomalies['date'], anomalies['value'],
-                    color='red', s=50, label='异常点')
+        ax.scatter(anomalies['date'], anomalies['value'],
+                   color='red', s=50, label='异常点')
 
         # 使用中文标题和标签
-        plt.title('时间序列分析', fontsize=14)
-        plt.xlabel('日期', fontsize=12)
-        plt.ylabel('数值', fontsize=12)
+        ax.set_title('时间序列分析', fontsize=14)
+        ax.set_xlabel('日期', fontsize=12)
+        ax.set_ylabel('数值', fontsize=12)
 
         # 添加网格和图例
-        plt.grid(alpha=0.3)
-        plt.legend()
+        ax.grid(alpha=0.3)
+        ax.legend()
 
         # 自动调整日期格式
-        plt.gcf().autofmt_xdate()
+        fig.autofmt_xdate()
 
-        plt.tight_layout()
-        plt.savefig('time_series_analysis.png')
+        fig.tight_layout()
+        fig.savefig('time_series_analysis.png')
         logger.info("图表已保存为 time_series_analysis.png")
 
         if not font_success:
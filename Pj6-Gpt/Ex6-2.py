@@ -4,13 +4,19 @@ import sys
 import re
 
 import matplotlib
-import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import numpy as np
 import pandas as pd
 
 # 设置中文字体和负号正常显示
 matplotlib.rcParams['font.sans-serif'] = ['SimHei']  # 黑体
 matplotlib.rcParams['axes.unicode_minus'] = False
+# 每块读取的行数
+CHUNK_SIZE = 500_000
+# 绘图点数上限
+MAX_PLOT_POINTS = 20_000
 
 
 def setup_logging(log_file: str):
@@ -35,82 +41,114 @@ def parse_args():
     return parser.parse_args()
 
 
+def validate_chunk(chunk: pd.DataFrame, cols_map: dict):
+    """校验一块数据，返回只含 日期/值 两列的有效行，以及无效日期行数、无效数值行数"""
+    # 解析失败的记为 NaT；长度必须为10，拒绝 2025-1-6 这类未补零的日期
+    raw_dates = chunk[cols_map['date']]
+    dates = pd.to_datetime(raw_dates, format="%Y-%m-%d", errors='coerce', cache=True)
+    valid_dates = dates.notna() & (raw_dates.astype(str).str.len() == 10)
+    invalid_dates = int((~valid_dates).sum())
+
+    # 数值列压缩为 float32
+    values = pd.to_numeric(chunk[cols_map['value']], errors='coerce', downcast='float')
+    # 与之前一致，无效数值只在日期有效的行中统计
+    valid_values = values.notna()
+    invalid_values = int((valid_dates & ~valid_values).sum())
+    part = pd.DataFrame({'日期': dates, '值': values})
+    if invalid_dates or invalid_values:
+        part = part[valid_dates & valid_values]
+    return part, invalid_dates, invalid_values
+
+
 def read_and_validate(path: str) -> pd.DataFrame:
     try:
-        df = pd.read_csv(path, encoding='utf-8')
+        # 只读表头
+        columns = pd.read_csv(path, encoding='utf-8', nrows=0).columns
     except Exception as e:
         logging.error(f"读取 CSV 文件失败 {path}: {e}")
         sys.exit(1)
 
-    df.columns = [col.strip() for col in df.columns]
     cols_map = {}
-    for col in df.columns:
-        low = col.lower()
+    for col in columns:
+        low = col.strip().lower()
         if re.search(r"^(日期|date)$", low):
             cols_map['date'] = col
         elif re.search(r"^(值|value)$", low):
             cols_map['value'] = col
 
     if 'date' not in cols_map or 'value' not in cols_map:
-        logging.error(f"缺少必要列：找到 {df.columns.tolist()}，需要 '日期'/'date' 和 '值'/'value'.")
+        logging.error(f"缺少必要列：找到 {[col.strip() for col in columns]}，需要 '日期'/'date' 和 '值'/'value'.")
         sys.exit(1)
 
-    def is_valid_date(s):
-        return isinstance(s, str) and re.match(r"^\d{4}-\d{2}-\d{2}$", s)
-
-    valid_dates = df[cols_map['date']].astype(str).apply(is_valid_date)
-    if not valid_dates.all():
-        count_invalid = (~valid_dates).sum()
-        logging.warning(f"发现 {count_invalid} 行日期格式无效，已删除这些行.")
-        df = df[valid_dates]
-
+    # 逐块校验
+    parts = []
+    invalid_dates = invalid_values = 0
     try:
-        df['日期'] = pd.to_datetime(df[cols_map['date']], format="%Y-%m-%d")
+        reader = pd.read_csv(path, encoding='utf-8', usecols=[cols_map['date'], cols_map['value']],
+                             chunksize=CHUNK_SIZE)
+        for chunk in reader:
+            part, bad_dates, bad_values = validate_chunk(chunk, cols_map)
+            parts.append(part)
+            invalid_dates += bad_dates
+            invalid_values += bad_values
     except Exception as e:
-        logging.error(f"日期解析失败: {e}")
+        logging.error(f"读取 CSV 文件失败 {path}: {e}")
         sys.exit(1)
 
-    df['值'] = pd.to_numeric(df[cols_map['value']], errors='coerce')
-    if df['值'].isnull().any():
-        count = df['值'].isnull().sum()
-        logging.warning(f"发现 {count} 行数值无效，已删除这些行.")
-        df = df.dropna(subset=['值'])
+    if invalid_dates:
+        logging.warning(f"发现 {invalid_dates} 行日期格式无效，已删除这些行.")
+    if invalid_values:
+        logging.warning(f"发现 {invalid_values} 行数值无效，已删除这些行.")
 
-    df = df.sort_values(by='日期').reset_index(drop=True)
-    return df[['日期', '值']]
+    df = pd.concat(parts, ignore_index=True)
+    return df.sort_values(by='日期').reset_index(drop=True)
 
 
 def compute_moving_average(df: pd.DataFrame, window: int) -> pd.Series:
-    return df['值'].rolling(window=window, min_periods=1).mean()
+    # 前缀和计算尾随移动平均（min_periods=1）
+    if window < 1:
+        raise ValueError(f"移动平均窗口必须为正整数: {window}")
+    values = df['值'].to_numpy()
+    prefix = np.cumsum(values, dtype=np.float64)
+    window_sums = prefix.copy()
+    window_sums[window:] -= prefix[:-window]
+    counts = np.minimum(np.arange(1, len(values) + 1), window)
+    return pd.Series((window_sums / counts).astype(values.dtype), index=df.index)
 
 
 def detect_anomalies(values: pd.Series, multiplier: float) -> pd.Series:
-    mean_val = values.mean()
-    std_val = values.std()
-    upper = mean_val + multiplier * std_val
-    lower = mean_val - multiplier * std_val
-    return (values > upper) | (values < lower)
+    # 偏差数组同时用于样本标准差(ddof=1)和阈值判断
+    v = values.to_numpy(dtype=np.float64)
+    if v.size < 2:
+        # 少于两个点时标准差无定义，不判定任何异常
+        return pd.Series(False, index=values.index)
+    deviation = v - v.mean()
+    std_val = np.sqrt(np.dot(deviation, deviation) / (v.size - 1))
+    return pd.Series(np.abs(deviation) > multiplier * std_val, index=values.index)
 
 
 def plot_series(df: pd.DataFrame, plot_file: str, window: int):
-    plt.figure(figsize=(12, 6))
-    plt.plot(df['日期'], df['值'], label='原始值')
-    plt.plot(df['日期'], df['移动平均'], label=f"移动平均({window} 天)")
+    fig = Figure(figsize=(12, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    # 点数过多时按步长抽样
+    stride = -(-len(df) // MAX_PLOT_POINTS)
+    plot_df = df.iloc[::stride] if stride > 1 else df
+    ax.plot(plot_df['日期'], plot_df['值'], label='原始值')
+    ax.plot(plot_df['日期'], plot_df['移动平均'], label=f"移动平均({window} 天)")
     anomalies = df[df['异常']]
     if not anomalies.empty:
-        plt.scatter(anomalies['日期'], anomalies['值'], c='red', label='异常点')
+        ax.scatter(anomalies['日期'], anomalies['值'], c='red', label='异常点')
 
-    ax = plt.gca()
     ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-    plt.xticks(rotation=45)
-    plt.xlabel('日期')
-    plt.ylabel('值')
-    plt.title('时间序列及其移动平均和异常检测')
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(plot_file, dpi=300)
-    plt.close()
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.set_xlabel('日期')
+    ax.set_ylabel('值')
+    ax.set_title('时间序列及其移动平均和异常检测')
+    ax.legend()
+    ax.grid(True)
+    fig.tight_layout()
+    fig.savefig(plot_file, dpi=300)
     logging.info(f"图像已保存至 {plot_file}")
 
 